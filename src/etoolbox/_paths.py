@@ -0,0 +1,14 @@
+"""Local cache and config paths.
+
+These only depend on :mod:`platformdirs` so that the CLI can show them in help text
+without importing :mod:`etoolbox.utils.cloud` or :mod:`etoolbox.utils.pudl`.
+"""
+
+from platformdirs import user_cache_path, user_config_path
+
+CLOUD_CONFIG_PATH = user_config_path("rmi.cloud", ensure_exists=True)
+AZURE_CACHE_PATH = user_cache_path("rmi.cloud", ensure_exists=True)
+RMICFEZIL_TOKEN_PATH = CLOUD_CONFIG_PATH / "rmicfezil_token.txt"
+
+PUDL_TOKEN_PATH = user_config_path("rmi.pudl") / ".pudl-access-key.json"
+PUDL_CACHE_PATH = user_cache_path("rmi.pudl", ensure_exists=True) / "aws"
@@ -136,6 +136,20 @@ class _TestKlassSlotsDict:
         return self.__class__.__qualname__ + f"({attrs})"
 
 
+class _TestKlassSlotsWeakref:
+    """Test class with slots and __weakref__ w/o get/set."""
+
+    __slots__ = ("__weakref__", "foo")
+
+    def __init__(self, **kwargs):
+        """Init."""
+        for k, v in kwargs.items():
+            setattr(self, k, v)
+
+    def __eq__(self, other):
+        return _eq_func(self, other)
+
+
 class _TestKlassCore:
     """Generic class w/o slots w/o get/set."""
 
@@ -3,10 +3,15 @@ from __future__ import annotations
 import getpass
 import logging
 from contextlib import suppress
+from functools import lru_cache
 from importlib import import_module
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
 LOGGER = logging.getLogger("etoolbox")
+_MISSING = object()
 
 
 def _quote_strip(string: str) -> str:
@@ -14,7 +19,12 @@ def _quote_strip(string: str) -> str:
 
 
 def _get_version(obj: Any) -> str:
-    mod = import_module(obj.__class__.__module__.partition(".")[0])
+    return _pkg_version(obj.__class__.__module__.partition(".")[0])
+
+
+@lru_cache(maxsize=256)
+def _pkg_version(pkg: str) -> str:
+    mod = import_module(pkg)
     for v_attr in ("__version__", "version", "release"):
         if hasattr(mod, v_attr):
             return getattr(mod, v_attr)
@@ -35,7 +45,12 @@ def _get_username():
 
 
 def _objinfo(obj: Any) -> str:
-    return obj.__class__.__module__ + "|" + obj.__class__.__qualname__
+    return _klass_info(obj.__class__)
+
+
+@lru_cache(maxsize=1024)
+def _klass_info(klass: type) -> str:
+    return klass.__module__ + "|" + klass.__qualname__
 
 
 def _get_klass(mod_klass: str | list | tuple):
@@ -50,6 +65,29 @@ def _get_klass(mod_klass: str | list | tuple):
         return klass
 
 
+@lru_cache(maxsize=512)
+def _getstate_func(klass: type) -> Callable | None:
+    """Find the method for getting the state of instances of ``klass``.
+
+    We cannot use hasattr on the instance in case ``__getattr__`` is defined and it
+    throws non-AttributeErrors if the object is not fully initialized, looking on the
+    class avoids that and lets us cache the result per class.
+    """
+    for attr in ("_dzgetstate_", "__getstate__"):
+        if hasattr(klass, attr):
+            return getattr(klass, attr)
+    return None
+
+
+@lru_cache(maxsize=512)
+def _setstate_func(klass: type) -> Callable:
+    """Find the method for setting the state of instances of ``klass``."""
+    for attr in ("_dzsetstate_", "__setstate__"):
+        if hasattr(klass, attr):
+            return getattr(klass, attr)
+    return default_setstate
+
+
 def default_setstate(obj, state):
     """Called if no ``__setstate__`` implementation."""
     if state is None:
@@ -68,12 +106,14 @@ def default_getstate(obj):
     """Called if no ``__getstate__`` implementation."""
 
     def slots_dict(_slots):
-        sout = {}
-        for k in _slots:
-            if k != "__dict__":
-                with suppress(AttributeError):
-                    sout.update({k: getattr(obj, k)})
-        return sout
+        # unset slots are skipped, the default avoids raising and catching for them,
+        # dunder slots like __dict__ and __weakref__ are not part of the state
+        return {
+            k: v
+            for k in _slots
+            if not (k[:2] == "__" and k[-2:] == "__")
+            and (v := getattr(obj, k, _MISSING)) is not _MISSING
+        }
 
     match obj:
         case object(__dict__=d_state, __slots__=slots):
@@ -3,23 +3,35 @@
 from __future__ import annotations
 
 import logging
+import mmap
 import pickle
+import struct
+import time
 import warnings
+import weakref
 from collections import Counter, OrderedDict, defaultdict, deque
 from collections.abc import KeysView
-from datetime import datetime
+from datetime import datetime, timezone
 from functools import partial
 from io import BytesIO
 from pathlib import Path, PosixPath, WindowsPath
 from types import NoneType
 from typing import TYPE_CHECKING, Any, ClassVar
-from zipfile import ZipFile
-from zoneinfo import ZoneInfo
+from zipfile import (
+    ZIP_DEFLATED,
+    ZIP_STORED,
+    ZipFile,
+    ZipInfo,
+    sizeFileHeader,
+    stringFileHeader,
+)
 
 import numpy as np
 import orjson as json
 import pandas as pd
 import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from etoolbox import __version__
 from etoolbox._optional import plotly, sqlalchemy
@@ -27,18 +39,30 @@ from etoolbox.datazip._utils import (
     _get_klass,
     _get_username,
     _get_version,
+    _getstate_func,
     _objinfo,
     _quote_strip,
+    _setstate_func,
     default_getstate,
-    default_setstate,
 )
 
 if TYPE_CHECKING:
     from collections.abc import Callable, Generator
+    from typing import IO
 
     from etoolbox.datazip._types import JSONABLE, DZable
 
 LOGGER = logging.getLogger("etoolbox")
+# names used internally that cannot be used as keys
+_RESERVED = frozenset({"__metadata__", "__attributes__", "__state__"})
+# sentinel for cache misses
+_MISSING = object()
+# types that are stored as is
+_ATOMIC = frozenset({str, int, float, bool, NoneType})
+_UTC = timezone.utc
+# codecs that can be used for parquet files, and other names for no compression
+_PARQUET_CODECS = frozenset({"none", "snappy", "gzip", "brotli", "lz4", "zstd"})
+_PARQUET_NONE = frozenset({"none", "uncompressed"})
 
 
 class DataZip(ZipFile):
@@ -70,12 +94,36 @@ class DataZip(ZipFile):
             mode: The mode can be either read 'r', or write 'w'.
             recipes: Deprecated.
             compression: ZIP_STORED (no compression), ZIP_DEFLATED (requires zlib),
-                ZIP_BZIP2 (requires bz2) or ZIP_LZMA (requires lzma).
+                ZIP_BZIP2 (requires bz2) or ZIP_LZMA (requires lzma), default is
+                ZIP_DEFLATED. This does not apply to ``parquet`` files which are
+                already compressed, they are always stored without additional
+                compression. With ZIP_STORED, the internal ``json`` files are still
+                compressed using ZIP_DEFLATED.
+            compresslevel: level to use with ``compression``, for ZIP_DEFLATED
+                integers 0 through 9 are accepted and the default is 1, see
+                :class:`zipfile.ZipFile`.
+            parquet_compression: compression codec for ``parquet`` files, one of
+                'snappy', 'gzip', 'brotli', 'lz4', 'zstd', or 'none' (also
+                'uncompressed' or None). The default is 'lz4' which is much faster to
+                read and write than the 'snappy' or 'zstd' defaults of :mod:`pandas`
+                and :mod:`polars` for a modest increase in size.
             ignore_pd_dtypes: if True, any dtypes stored in a DataZip for
                 :class:`pandas.DataFrame` columns or :class:`pandas.Series` will be
                 ignored. This may be useful when using global settings for
                 ``mode.dtype_backend`` or ``mode.use_nullable_dtypes`` to force the use
                 of ``pyarrow`` types.
+            pd_arrow_dtypes: if True, :class:`pandas.DataFrame` and
+                :class:`pandas.Series` are read with :class:`pandas.ArrowDtype`
+                dtypes directly from the ``parquet`` rather than being converted to
+                their stored dtypes. This avoids copying the data and so reduces peak
+                memory when reading large objects. Requires :mod:`pandas` >= 2.0.
+            cache_decoded: if True (the default), data read from ``parquet`` and
+                ``npy`` files is kept so that getting an item again, or another item
+                that refers to the same data, returns the same object without
+                reading it again. If False, each is read fresh when needed and is not
+                kept by the :class:`.DataZip`, which reduces peak memory when reading
+                large objects but means shared references are not preserved across
+                items.
             args: additional positional will be passed to
                 :meth:`zipfile.ZipFile.__init__`.
             kwargs: keyword arguments will be passed to
@@ -155,6 +203,13 @@ class DataZip(ZipFile):
             file = Path(file)
 
         clobber = kwargs.pop("clobber", False)
+        self._parquet_compression = self._parquet_codec(
+            kwargs.pop("parquet_compression", "lz4")
+        )
+        self._pd_arrow_dtypes = kwargs.pop("pd_arrow_dtypes", False)
+        if self._pd_arrow_dtypes and pd.__version__ < "2.0.0":
+            raise ValueError("`pd_arrow_dtypes=True` requires pandas >= 2.0.0")
+        self._cache_decoded = kwargs.pop("cache_decoded", True)
         if isinstance(file, Path):
             file = file.with_suffix(".zip")
             if file.exists() and mode == "w":
@@ -166,10 +221,23 @@ class DataZip(ZipFile):
                         f"existing DataZip."
                     )
 
+        # args are compression, allowZip64, compresslevel
+        if not args:
+            kwargs.setdefault("compression", ZIP_DEFLATED)
+        if len(args) < 3 and (args or [kwargs["compression"]])[0] == ZIP_DEFLATED:
+            # higher levels cost a lot more time for little reduction in size
+            kwargs.setdefault("compresslevel", 1)
         super().__init__(file, mode, *args, **kwargs)
         self._ignore_pd_dtypes = ignore_pd_dtypes
         self._attributes, self._metadata = {"__state__": {}}, {"__rev__": 2}
         self._ids, self._red = {}, {}
+        # objects in _ids are kept alive or watched so that their ids are not reused
+        # while they are registered, see :meth:`DataZip._register_id`
+        self._refs, self._alive = {}, []
+        # memory map of the whole archive, see :meth:`DataZip._member_buffer`
+        self._mmap: pa.Buffer | None = None
+        # encoders found for subclasses of types in ``_SUBCLASS_ENCODABLE``
+        self._subclass_encoders: dict[type, Callable | None] = {}
         if mode == "r":
             self._attributes = self._json_get(
                 "__attributes__", "attributes", "other_attrs"
@@ -183,6 +251,16 @@ class DataZip(ZipFile):
                     stacklevel=2,
                 )
                 self._attributes = self._attributes | self._load_legacy_helper()
+        else:
+            # provenance recorded with every object's state is the same for all of
+            # them so we only determine it once
+            self._obj_meta = {
+                "__io_version__": __version__,
+                "__created_by__": _get_username(),
+                "__file_created__": str(datetime.now(tz=_UTC)),
+            }
+        # public keys, i.e. everything in _attributes except __state__
+        self._keys: set[str] = set(self._attributes) - {"__state__"}
 
         self._delete_on_close = None
 
@@ -382,25 +460,35 @@ class DataZip(ZipFile):
             return
 
         if self.mode == "w":
+            # json compresses very well so we compress it even if other members are
+            # not compressed
+            json_kw = (
+                {"compress_type": ZIP_DEFLATED, "compresslevel": 1}
+                if self.compression == ZIP_STORED
+                else {}
+            )
             self.writestr(
                 "__attributes__.json",
                 json.dumps(
-                    self._attributes, option=json.OPT_NON_STR_KEYS | json.OPT_INDENT_2
+                    self._attributes,
+                    option=json.OPT_NON_STR_KEYS | json.OPT_SERIALIZE_NUMPY,
                 ),
+                **json_kw,
             )
-            self.writestr("__metadata__.json", json.dumps(self._metadata))
-        self._red = {}
+            self.writestr("__metadata__.json", json.dumps(self._metadata), **json_kw)
+        self._red, self._mmap = {}, None
+        self.reset_ids()
         super().close()
         if isinstance(self._delete_on_close, Path):
             self._delete_on_close.unlink()
 
     def __contains__(self, item) -> bool:
         """Provide ``in`` check."""
-        return item.partition(".")[0] in self._attributes
+        return item in self._keys or item.partition(".")[0] in self._keys
 
     def __len__(self) -> int:
         """Provide for use of ``len`` builtin."""
-        return len(self._attributes) - (1 if "__state__" in self._attributes else 0)
+        return len(self._keys)
 
     def __getitem__(self, key: str | tuple) -> DZable:
         """Retrieve an item from a :class:`.DataZip`.
@@ -434,14 +522,15 @@ class DataZip(ZipFile):
         """Write an item to a :class:`.DataZip`."""
         if self.mode == "r":
             raise ValueError("Writing to DataZip requires mode 'w'")
-        if key in ("__metadata__", "__attributes__", "__state__"):
+        if key in _RESERVED:
             raise KeyError(f"{key=} is reserved, please use a different name")
         if key in self._attributes:
             raise KeyError(f"{key=} already in {self.filename}")
         if not isinstance(key, str):
             raise TypeError(f"{key=} is invalid, key must be a string.")
         if (for_attributes := self._encode(key, value)) != "__IGNORE__":
-            self._attributes.update({key: for_attributes})
+            self._attributes[key] = for_attributes
+            self._keys.add(key)
 
     def get(self, key: str, default=None) -> DZable:
         """Retrieve an item if it is there otherwise return default."""
@@ -456,35 +545,75 @@ class DataZip(ZipFile):
 
         See :func:`id`.
         """
-        self._ids = {}
+        self._ids, self._refs, self._alive = {}, {}, []
+
+    def _register_id(self, item: Any, name: str | int, klass: type) -> None:
+        """Record that ``item`` is stored as ``name``.
+
+        An object's :func:`id` can be reused once it has been garbage collected, so
+        we either keep a weak reference that removes the record when ``item`` is
+        collected or, for objects that cannot be weakly referenced, keep ``item``
+        alive until the records are reset.
+        """
+        key = (id(item), klass)
+        self._ids[key] = name
+        try:
+            self._refs[key] = weakref.ref(
+                item,
+                lambda _, k=key, ids=self._ids, refs=self._refs: (
+                    ids.pop(k, None),
+                    refs.pop(k, None),
+                ),
+            )
+        except TypeError:
+            self._alive.append(item)
 
     def items(self) -> Generator[str, DZable]:
         """Lazily read name/key valye pairs from a :class:`.DataZip`."""
-        for k in self._attributes.keys():  # noqa: SIM118
+        for k, v in self._attributes.items():
             if k == "__state__":
                 continue
-            yield k, self[k]
+            yield k, self._decode(v)
 
     def keys(self) -> KeysView:
         """Set of names in :class:`.DataZip` as if it was a MutableMapping."""
-        return KeysView(set(self._attributes) - {"__state__"})
+        return KeysView(self._keys)
 
     def _decode(self, obj: Any) -> Any:
         """Entry point for decoding anything stored :class:`DataZip`."""
-        if decoder := self.DECODERS.get(type(obj), None):
+        # JSON scalars and containers are by far the most common so we handle them
+        # here rather than with a lookup and call through DECODERS
+        if (
+            (t := type(obj)) is str
+            or t is int
+            or t is float
+            or t is bool
+            or t is NoneType
+        ):
+            return obj
+        if t is list:
+            return [self._decode(v) for v in obj]
+        if t is dict:
+            return self._decode_dict(obj)
+        if decoder := self.DECODERS.get(t, None):
             return decoder(self, obj)
         raise TypeError(f"no decoder for {type(obj)} {obj}")
 
     def _decode_cache_helper(self, obj: dict, func, **kwargs) -> Any:
-        if obj["__loc__"] in self._red:
-            return self._red[obj["__loc__"]]
+        if (out := self._red.get(loc := obj["__loc__"], _MISSING)) is not _MISSING:
+            return out
         out = func(self, obj, **kwargs)
-        self._red[obj["__loc__"]] = out
+        if self._cache_decoded:
+            self._red[loc] = out
         return out
 
     def _decode_dict(self, obj: dict) -> Any:
-        if "__type__" in obj:
-            return self.DECODERS.get(obj["__type__"], DataZip._decode_obj)(self, obj)
+        if (type_ := obj.get("__type__")) is not None:
+            return self.DECODERS.get(type_, DataZip._decode_obj)(self, obj)
+        # leaf dicts of JSON scalars need no decoding, we still copy them so that
+        # changes to what we return don't alter ``_attributes``
+        if all(type(v) in _ATOMIC for v in obj.values()):
+            return obj.copy()
         return {k: self._decode(v) for k, v in obj.items()}
 
     @staticmethod
@@ -495,81 +624,133 @@ class DataZip(ZipFile):
             LOGGER.error("Namedtuple will be returned as a normal tuple, %r", exc)
             return tuple(obj["items"].values())
 
-    decode_pd_df: ClassVar[dict[tuple, Callable]] = {
-        (True, True, True, True): lambda df, cols, names, dtypes: df.set_axis(
-            pd.MultiIndex.from_tuples(cols, names=names), axis=1
-        ).astype({tuple(a): b for a, b in dtypes}),
-        (True, False, True, False): lambda df, cols, names, _: df.set_axis(
-            pd.MultiIndex.from_tuples(cols, names=names), axis=1
-        ),
-        (True, True, False, False): lambda df, cols, names, dtypes: df.set_axis(
-            pd.Index(cols, name=names[0]), axis=1
-        ).astype(dict(dtypes)),
-        (True, False, False, False): lambda df, cols, names, _: df.set_axis(
-            pd.Index(cols, name=names[0]), axis=1
-        ),
-        (False, True, False, False): lambda df, _, __, dtypes: df.astype(dict(dtypes)),
-        (False, False, False, False): lambda df, _, __, ___: df,
-        # pandas 2.0 doesn't raise a ValueError when there are non str column names
-        # it powers through and restores them. When combined with ujson turning tuples
-        # into strings, rather than lists, we have to be able to more actively process
-        # dtype info
-        (False, True, False, True): lambda df, _, __, dtypes: df.astype(
-            {tuple(a): b for a, b in dtypes}
-        ),
-        (True, True, False, True): lambda df, cols, names, dtypes: df.set_axis(
-            pd.Index(cols, name=names[0]), axis=1
-        ).astype({tuple(a): b for a, b in dtypes}),
-        (False, False, False, True): lambda df, cols, names, dtypes: df.astype(
-            {tuple(a): b for a, b in dtypes}
-        ),
-    }
+    def _member_buffer(self, name: str) -> pa.Buffer:
+        """Get the contents of member ``name`` as a :class:`pyarrow.Buffer`.
+
+        When reading from a file, uncompressed members are sliced out of a memory map
+        of the archive rather than copied into memory, other members are read normally.
+        We map the file the :class:`.DataZip` opened itself rather than opening its
+        path again, which may since refer to something else, file objects passed in
+        are always read normally.
+        """
+        info = self.getinfo(name)
+        if (
+            self.mode == "r"
+            and not self._filePassed
+            and info.compress_type == ZIP_STORED
+            and not info.flag_bits & 0x1
+        ):
+            if self._mmap is None:
+                # the map is closed when it and any buffers sliced from it are freed
+                self._mmap = pa.py_buffer(
+                    mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+                )
+            start = info.header_offset + sizeFileHeader
+            header = self._mmap.slice(info.header_offset, sizeFileHeader).to_pybytes()
+            if header[:4] == stringFileHeader:
+                # the local header's name and extra field lengths can differ from
+                # those in the central directory, so we use the local ones
+                start += sum(struct.unpack_from("<HH", header, 26))
+                if start + info.file_size <= self._mmap.size:
+                    return self._mmap.slice(start, info.file_size)
+        return pa.py_buffer(self.read(name))
+
+    def _read_pd_parquet(self, name: str) -> pd.DataFrame:
+        reader = pa.BufferReader(self._member_buffer(name))
+        if not self._pd_arrow_dtypes:
+            return pd.read_parquet(reader)
+        table = pq.read_table(reader)
+        meta = table.schema.metadata or {}
+        # ``self_destruct`` frees each column's arrow memory as it is converted so
+        # we never hold two copies of the data
+        out = table.to_pandas(
+            split_blocks=True, self_destruct=True, types_mapper=pd.ArrowDtype
+        )
+        del table
+        if b"PANDAS_ATTRS" in meta:
+            out.attrs = json.loads(meta[b"PANDAS_ATTRS"])
+        return out
 
     def _decode_pd_df(self, obj) -> pd.DataFrame:
-        out = pd.read_parquet(BytesIO(self.read(obj["__loc__"])))
-        dtypes = obj.get("dtypes", [[0]])
+        out = self._read_pd_parquet(obj["__loc__"])
         cols, names = obj.get("no_pqt_cols", (None, None))
-        return self.decode_pd_df[
-            (
-                # True -> we have no_pqt_cols data
-                not all((cols is None, names is None)),
-                # True -> we have dtypes data
-                dtypes != [[0]] and not self._ignore_pd_dtypes,
-                # True -> we need a multiindex
-                isinstance(names, list) and len(names) > 1,
-                # True -> we have dtypes as a list of lists
-                not any((isinstance(dtypes, dict), self._ignore_pd_dtypes))
-                and len(dtypes) > 0
-                and isinstance(dtypes[0][0], list),
-            )
-        ](out, cols, names, dtypes)
+        if cols is not None or names is not None:
+            if isinstance(names, list) and len(names) > 1:
+                columns = pd.MultiIndex.from_tuples(cols, names=names)
+            else:
+                # json turns tuple column names into lists
+                columns = pd.Index(
+                    [tuple(c) if isinstance(c, list) else c for c in cols],
+                    name=names[0],
+                    tupleize_cols=False,
+                )
+            out = out.set_axis(columns, axis=1)
+        dtypes = obj.get("dtypes", [[0]])
+        if self._ignore_pd_dtypes or self._pd_arrow_dtypes or dtypes == [[0]]:
+            return out
+        if isinstance(dtypes, dict):
+            dtypes = list(dtypes.items())
+        if len(dtypes) == out.shape[1]:
+            # parquet restores most dtypes so we only convert columns where it did not
+            dtypes = [
+                (col, dtype)
+                for (col, dtype), current in zip(
+                    dtypes, out.dtypes.astype(str), strict=True
+                )
+                if current != dtype
+            ]
+        if not dtypes:
+            return out
+        # pandas 2.0 doesn't raise a ValueError when there are non str column names
+        # it powers through and restores them. Because json turns tuples into lists,
+        # dtypes for tuple column names have lists as keys that we need to convert
+        return out.astype(
+            {tuple(c) if isinstance(c, list) else c: dtype for c, dtype in dtypes}
+        )
 
     def _decode_pd_series(self, obj) -> pd.Series:
-        out = pd.read_parquet(BytesIO(self.read(obj["__loc__"]))).squeeze()
+        # a series is stored as a single column frame, ``squeeze`` would also turn a
+        # series of length 1 into a scalar
+        out = self._read_pd_parquet(obj["__loc__"]).iloc[:, 0]
         cols, names = obj.get("no_pqt_cols", (None, None))
         out.name = tuple(cols) if isinstance(cols, list) else cols
-        return (
-            out.astype(obj["dtypes"])
-            if "dtypes" in obj and not self._ignore_pd_dtypes
-            else out
+        if (
+            "dtypes" not in obj
+            or self._ignore_pd_dtypes
+            or self._pd_arrow_dtypes
+            # parquet usually restores the dtype, in which case astype would only copy
+            or str(out.dtype) == obj["dtypes"]
+        ):
+            return out
+        return out.astype(obj["dtypes"])
+
+    def _decode_pl_df(self, obj) -> pl.DataFrame:
+        return pl.from_arrow(
+            pq.read_table(pa.BufferReader(self._member_buffer(obj["__loc__"])))
         )
 
+    def _decode_ndarray(self, obj) -> np.ndarray:
+        # reading from the member directly means numpy fills the array as it reads
+        # rather than us first reading the whole member into bytes
+        with self.open(obj["__loc__"]) as fh:
+            return np.load(fh)
+
+    def _decode_pickle(self, obj) -> Any:
+        with self.open(obj["__loc__"]) as fh:
+            return pickle.load(fh)  # noqa: S301
+
     def _decode_obj(self, obj, klass=None) -> Any:
-        if obj["__loc__"] in self._red:
-            return self._red[obj["__loc__"]]
+        # ``__loc__`` can be an int when the object was in a list, its state is stored
+        # under the str version because json keys are always str
+        key = loc if type(loc := obj["__loc__"]) is str else str(loc)
+        if (out_obj := self._red.get(key, _MISSING)) is not _MISSING:
+            return out_obj
         if klass is None:
             klass = _get_klass(obj["__type__"].split("|"))
         out_obj = klass.__new__(klass)
-        state = self._decode(self._attributes["__state__"][str(obj["__loc__"])])
-        # we cannot use hasattr here in case __getattr__ is defined and it throws
-        # non-AttributeErrors if the object is not yet fully initialized
-        if hasattr(klass, "_dzsetstate_"):
-            out_obj._dzsetstate_(state)
-        elif hasattr(klass, "__setstate__"):
-            out_obj.__setstate__(state)
-        else:
-            default_setstate(out_obj, state)
-        self._red[str(obj["__loc__"])] = out_obj
+        state = self._decode(self._attributes["__state__"][key])
+        _setstate_func(klass)(out_obj, state)
+        self._red[key] = out_obj
         return out_obj
 
     DECODERS: ClassVar[dict[type | str | tuple, Callable]] = {
@@ -600,34 +781,20 @@ class DataZip(ZipFile):
         "namedtuple": _decode_namedtuple,
         "pdDataFrame": partial(_decode_cache_helper, func=_decode_pd_df),
         "pdSeries": partial(_decode_cache_helper, func=_decode_pd_series),
-        "ndarray": partial(
-            _decode_cache_helper,
-            func=lambda self, obj: np.load(BytesIO(self.read(obj["__loc__"]))),
-        ),
+        "ndarray": partial(_decode_cache_helper, func=_decode_ndarray),
         "saEngine": lambda _, obj: sqlalchemy.create_engine(obj["items"]["url"]),
-        "plDataFrame": partial(
-            _decode_cache_helper,
-            func=lambda self, obj: pl.read_parquet(
-                BytesIO(self.read(obj["__loc__"])), use_pyarrow=True
-            ),
-        ),
+        "plDataFrame": partial(_decode_cache_helper, func=_decode_pl_df),
         "plLazyFrame": partial(
             _decode_cache_helper,
-            func=lambda self, obj: pl.read_parquet(
-                BytesIO(self.read(obj["__loc__"])), use_pyarrow=True
-            ).lazy(),
+            func=lambda self, obj: self._decode_pl_df(obj).lazy(),
         ),
         "plSeries": partial(
             _decode_cache_helper,
-            func=lambda self, obj: pl.read_parquet(
-                BytesIO(self.read(obj["__loc__"])), use_pyarrow=True
-            )
+            func=lambda self, obj: self._decode_pl_df(obj)
             .to_series()
             .alias(obj["col_name"]),
         ),
-        "pgoFigure": lambda self, obj: pickle.load(  # noqa: S301
-            BytesIO(self.read(obj["__loc__"]))
-        ),
+        "pgoFigure": _decode_pickle,
         # LEGACY type encoding
         ("builtins", "tuple", None): lambda self, obj: tuple(
             self._decode(v) for v in obj["items"]
@@ -641,15 +808,37 @@ class DataZip(ZipFile):
         ("pandas.core.series", "Series", None): partial(
             _decode_cache_helper, func=_decode_pd_series
         ),
-        ("numpy", "ndarray", None): partial(
-            _decode_cache_helper,
-            func=lambda self, obj: np.load(BytesIO(self.read(obj["__loc__"]))),
-        ),
+        ("numpy", "ndarray", None): partial(_decode_cache_helper, func=_decode_ndarray),
     }
 
     def _encode(self, name, item) -> JSONABLE:
         """Entry point for encoding anything to store in :class:`DataZip`."""
-        if encoder := self.ENCODERS.get(type(item), None):
+        # scalars, lists, and dicts are by far the most common so we handle them here
+        # rather than with a lookup and call through ENCODERS
+        if (
+            (t := type(item)) is str
+            or t is int
+            or t is float
+            or t is bool
+            or t is NoneType
+        ):
+            return item
+        if t is list:
+            return self._encode_items(item)
+        if t is dict:
+            return self._encode_dict(name, item)
+        if encoder := self.ENCODERS.get(t, None):
+            return encoder(self, name, item)
+        if (encoder := self._subclass_encoders.get(t, _MISSING)) is _MISSING:
+            encoder = self._subclass_encoders[t] = next(
+                (
+                    self.ENCODERS[base]
+                    for base in t.__mro__[1:]
+                    if base in self._SUBCLASS_ENCODABLE
+                ),
+                None,
+            )
+        if encoder is not None:
             return encoder(self, name, item)
         if isinstance(item, tuple) and hasattr(item, "_asdict"):
             return {
@@ -666,28 +855,56 @@ class DataZip(ZipFile):
 
         return self._encode_obj(name, item)
 
-    def _encode_loc_helper(self, name: str, data: Any, to_write: Any) -> str:
+    def _encode_loc_helper(
+        self, name: str, data: Any, to_write: Callable[[IO[bytes]], None]
+    ) -> str:
+        """Create a new member named after ``name`` and write to it.
+
+        ``to_write`` takes the open member and writes the contents to it directly.
+        """
         i = 0
         new_name = name
-        while new_name in self.namelist():
+        while new_name in self.NameToInfo:
             new_name = f"{i}_{name}"
             i += 1
-        self.writestr(new_name, to_write)
-        self._ids[(id(data), type(data))] = new_name
+        # set up the member as :meth:`zipfile.ZipFile.writestr` would, opening it
+        # by name alone would leave it dated 1980-01-01
+        zinfo = ZipInfo(new_name, date_time=time.localtime(time.time())[:6])
+        zinfo.external_attr = 0o600 << 16
+        if new_name.endswith(".parquet"):
+            # parquet is already compressed so compressing it again costs time and
+            # saves little or no space
+            zinfo.compress_type = ZIP_STORED
+        else:
+            zinfo.compress_type = self.compression
+            zinfo._compresslevel = self.compresslevel
+        with self.open(zinfo, "w", force_zip64=True) as fh:
+            to_write(fh)
+        self._register_id(data, new_name, type(data))
         return new_name
 
+    def _encode_items(self, items: list | tuple | set | frozenset | deque) -> list:
+        """Encode the items of a list or other collection as a list."""
+        # names are still needed for items that are stored as their own member or
+        # with state, but when every item is stored as is we can just copy
+        if all(type(e) in _ATOMIC for e in items):
+            return list(items)
+        return [self._encode(i, e) for i, e in enumerate(items)]
+
+    def _encode_collection(self, _, item: tuple | set | frozenset | deque) -> dict:
+        # only exact types are looked up in ENCODERS so the name is also the tag
+        return {"__type__": type(item).__name__, "items": self._encode_items(item)}
+
     def _encode_dict(self, _, data: dict) -> dict:
         # we need to encode the dict differently if any keys are not int | str
-        if set(map(type, data.keys())) - {str}:
+        if any(type(k) is not str for k in data):
             return {
                 "__type__": "dict_aslist",
                 "items": [self._encode(_, item) for _, item in enumerate(data.items())],
             }
-        # ecode then filter
+        # encode and filter in one pass
         return {
-            k: v
-            for k, v in {k_: self._encode(k_, v_) for k_, v_ in data.items()}.items()
-            if v != "__IGNORE__"
+            k: v for k, v_ in data.items() if (v := self._encode(k, v_)) != "__IGNORE__"
         }
 
     def _encode_pd_df(self, name: str, df: pd.DataFrame, **kwargs) -> dict:
@@ -695,10 +912,19 @@ class DataZip(ZipFile):
         if loc := self._ids.get((id(df), type(df)), None):
             return {"__type__": "pdDataFrame", "__loc__": loc}
         try:
+            # column labels pandas cannot store in parquet or cannot restore from it
+            # go straight to the str columns path rather than failing first, bool
+            # labels are the worst as they come back as all True without any error
+            if (
+                isinstance(df.columns, pd.MultiIndex)
+                or (inferred := df.columns.inferred_type).startswith("mixed")
+                or inferred == "boolean"
+            ):
+                raise ValueError
             return {
                 "__type__": "pdDataFrame",
                 "__loc__": self._encode_loc_helper(
-                    f"{name}.parquet", df, df.to_parquet()
+                    f"{name}.parquet", df, self._pd_to_parquet(df)
                 ),
                 # pandas 2.0 doesn't raise a ValueError when there are non str column
                 # names, which means we can end up here even when there is a column
@@ -709,7 +935,7 @@ class DataZip(ZipFile):
             return {
                 "__type__": "pdDataFrame",
                 "__loc__": self._encode_loc_helper(
-                    f"{name}.parquet", df, self._str_cols(df).to_parquet()
+                    f"{name}.parquet", df, self._pd_to_parquet(self._str_cols(df))
                 ),
                 "no_pqt_cols": [list(df.columns), list(df.columns.names)],
                 "dtypes": list(df.dtypes.astype(str).to_dict().items()),
@@ -726,7 +952,9 @@ class DataZip(ZipFile):
         return {
             "__type__": "pdSeries",
             "__loc__": self._encode_loc_helper(
-                f"{name}.parquet", df, df.to_frame(name="IGNORETHISNAME").to_parquet()
+                f"{name}.parquet",
+                df,
+                self._pd_to_parquet(df.to_frame(name="IGNORETHISNAME")),
             ),
             "no_pqt_cols": [
                 list(df.name) if isinstance(df.name, tuple) else df.name,
@@ -739,66 +967,93 @@ class DataZip(ZipFile):
         """Write a polars df in the ZIP as parquet."""
         if loc := self._ids.get((id(df), type(df)), None):
             return {"__type__": "plDataFrame", "__loc__": loc}
-        df.write_parquet(temp := BytesIO())
         return {
             "__type__": "plDataFrame",
-            "__loc__": self._encode_loc_helper(f"{name}.parquet", df, temp.getvalue()),
+            "__loc__": self._encode_loc_helper(
+                f"{name}.parquet", df, self._pl_to_parquet(df)
+            ),
         }
 
     def _encode_pl_ldf(self, name: str, df: pl.LazyFrame, **kwargs) -> dict:
         """Write a polars df in the ZIP as parquet."""
         if loc := self._ids.get((id(df), type(df)), None):
             return {"__type__": "plLazyFrame", "__loc__": loc}
-        df.collect().write_parquet(temp := BytesIO())
         return {
             "__type__": "plLazyFrame",
-            "__loc__": self._encode_loc_helper(f"{name}.parquet", df, temp.getvalue()),
+            "__loc__": self._encode_loc_helper(
+                f"{name}.parquet", df, self._pl_to_parquet(df.collect())
+            ),
         }
 
     def _encode_pl_series(self, name: str, df: pl.Series, **kwargs) -> dict:
         """Write a polars series in the ZIP as parquet."""
         if loc := self._ids.get((id(df), type(df)), None):
             return {"__type__": "plSeries", "__loc__": loc}
-        df.to_frame("IGNORE").write_parquet(temp := BytesIO())
         return {
             "__type__": "plSeries",
-            "__loc__": self._encode_loc_helper(f"{name}.parquet", df, temp.getvalue()),
+            "__loc__": self._encode_loc_helper(
+                f"{name}.parquet", df, self._pl_to_parquet(df.to_frame("IGNORE"))
+            ),
             "col_name": df.name,
         }
 
     def _encode_ndarray(self, name: str, data: np.ndarray, **kwargs) -> dict:
         if loc := self._ids.get((id(data), type(data)), None):
             return {"__type__": "ndarray", "__loc__": loc}
-        np.save(temp := BytesIO(), data, allow_pickle=False)
+        # checked before the member is opened so a failure leaves nothing behind
+        if data.dtype.hasobject:
+            raise ValueError("Object arrays cannot be saved when allow_pickle=False")
         return {
             "__type__": "ndarray",
-            "__loc__": self._encode_loc_helper(f"{name}.npy", data, temp.getvalue()),
+            "__loc__": self._encode_loc_helper(
+                f"{name}.npy", data, partial(self._write_npy, data=data)
+            ),
         }
 
+    @staticmethod
+    def _write_npy(fh: IO[bytes], data: np.ndarray) -> None:
+        """Write ``data`` to ``fh`` in ``.npy`` format.
+
+        For C-contiguous arrays we write the header ourselves and then the array's
+        own buffer so the data is never copied, :func:`numpy.lib.format.write_array`
+        handles everything else, including structured arrays whose field names may
+        need a version 3.0 header.
+        """
+        if not data.flags.c_contiguous or data.dtype.names is not None:
+            np.lib.format.write_array(fh, data, allow_pickle=False)
+            return
+        header = np.lib.format.header_data_from_array_1_0(data)
+        try:
+            np.lib.format.write_array_header_1_0(fh, header)
+        except ValueError:
+            np.lib.format.write_array_header_2_0(fh, header)
+        fh.write(memoryview(data.reshape(-1).view(np.uint8)))
+
     def _encode_obj(self, name: str, item: Any) -> dict:
         klass = item.__class__
-        if hasattr(klass, "_dzgetstate_"):
-            state = item._dzgetstate_()
-        elif hasattr(klass, "__getstate__"):
-            state = item.__getstate__()
+        if (getstate := _getstate_func(klass)) is not None:
+            state = getstate(item)
         elif hasattr(item, "__dict__") or hasattr(item, "__slots__"):
             state = default_getstate(item)
         else:
             raise TypeError(f"no encoder for {type(item)}")
 
-        if name in self._attributes["__state__"]:
-            name = f"{id(item)}_{name}"
+        # state names must be unique, ids can be reused once objects are collected so
+        # we use a counter like :meth:`DataZip._encode_loc_helper`, names are str
+        # because they become json keys anyway
+        i = 0
+        new_name = name = str(name)
+        while new_name in self._attributes["__state__"]:
+            new_name = f"{i}_{name}"
+            i += 1
 
-        self._ids[(id(item), klass)] = name
-        self._attributes["__state__"][name] = self._encode("state", state)
+        self._register_id(item, new_name, klass)
+        self._attributes["__state__"][new_name] = self._encode("state", state)
         return {
             "__type__": _objinfo(item),
-            "__loc__": name,
+            "__loc__": new_name,
             "__obj_version__": _get_version(item),
-            "__io_version__": __version__,
-            "__created_by__": _get_username(),
-            "__file_created__": str(datetime.now(tz=ZoneInfo("UTC"))),
-        }
+        } | self._obj_meta
 
     def _encode_ignore(self, name, item):
         LOGGER.warning("%s of type %s will not be encoded", name, type(item))
@@ -810,20 +1065,11 @@ class DataZip(ZipFile):
         bool: lambda _, __, item: item,
         float: lambda _, __, item: item,
         NoneType: lambda _, __, item: item,
-        list: lambda self, _, item: [self._encode(i, e) for i, e in enumerate(item)],
-        tuple: lambda self, _, item: {
-            "__type__": "tuple",
-            "items": [self._encode(i, e) for i, e in enumerate(item)],
-        },
+        list: lambda self, _, item: self._encode_items(item),
+        tuple: _encode_collection,
         dict: _encode_dict,
-        set: lambda self, _, item: {
-            "__type__": "set",
-            "items": [self._encode(i, e) for i, e in enumerate(item)],
-        },
-        frozenset: lambda self, _, item: {
-            "__type__": "frozenset",
-            "items": [self._encode(i, e) for i, e in enumerate(item)],
-        },
+        set: _encode_collection,
+        frozenset: _encode_collection,
         complex: lambda _, __, item: {
             "__type__": "complex",
             "items": [item.real, item.imag],
@@ -841,10 +1087,7 @@ class DataZip(ZipFile):
             "__type__": "Counter",
             "items": self._encode_dict(__, item),
         },
-        deque: lambda self, __, item: {
-            "__type__": "deque",
-            "items": [self._encode(_, e) for _, e in enumerate(item)],
-        },
+        deque: _encode_collection,
         OrderedDict: lambda self, __, item: {
             "__type__": "OrderedDict",
             "items": self._encode_dict(__, item),
@@ -868,7 +1111,9 @@ class DataZip(ZipFile):
         },
         plotly.graph_objects.Figure: lambda self, name, item: {
             "__type__": "pgoFigure",
-            "__loc__": self._encode_loc_helper(f"{name}.pkl", item, pickle.dumps(item)),
+            "__loc__": self._encode_loc_helper(
+                f"{name}.pkl", item, partial(pickle.dump, item, protocol=5)
+            ),
         },
         pl.DataFrame: _encode_pl_df,
         pl.LazyFrame: _encode_pl_ldf,
@@ -876,10 +1121,36 @@ class DataZip(ZipFile):
         # things to ignore
         partial: _encode_ignore,
     }
+    # other numpy bool, int, and float scalars are stored as their python equivalent
+    ENCODERS.update(
+        dict.fromkeys(
+            (
+                np.bool_,
+                np.int8,
+                np.int16,
+                np.int32,
+                np.uint8,
+                np.uint16,
+                np.uint32,
+                np.uint64,
+                # distinct from the sized types above on some platforms
+                np.longlong,
+                np.ulonglong,
+                np.float16,
+                np.float32,
+            ),
+            lambda _, __, item: item.item(),
+        )
+    )
+    # subclasses of these types are stored (and so returned) as the base type,
+    # they cannot be handled as generic objects
+    _SUBCLASS_ENCODABLE: ClassVar[frozenset[type]] = frozenset(
+        {np.ndarray, pd.DataFrame, pd.Series, pl.DataFrame, pl.LazyFrame, pl.Series}
+    )
 
     def _load_legacy_helper(self) -> dict:
         obj_meta = self._metadata.get("obj_meta", self._json_get("obj_meta"))
-        locs = []
+        locs = set()
 
         def _make_attr_entry(k_, locs_):
             _attr = {}
@@ -887,9 +1158,9 @@ class DataZip(ZipFile):
                 _attr.update({"__type__": objinfo})
                 if (
                     file_ := "".join((k_, self.suffixes.get(objinfo, "")))
-                ) in self.namelist():
+                ) in self.NameToInfo:
                     _attr.update({"__loc__": file_})
-                    locs_.append(file_)
+                    locs_.add(file_)
                 elif k_ in self._attributes:
                     _attr.update({"items": self._attributes[k_]})
                 if k_ in _no_pqt_cols:
@@ -915,7 +1186,7 @@ class DataZip(ZipFile):
             if attr:
                 attrs.update({k: attr})
 
-        for file in self.namelist():
+        for file in self.NameToInfo:
             stem, suffix = file.split(".")
             if file not in locs and suffix == "parquet":
                 bc = {"no_pqt_cols": _no_pqt_cols[stem]} if stem in _no_pqt_cols else {}
@@ -925,16 +1196,74 @@ class DataZip(ZipFile):
 
         return attrs
 
+    def _pd_to_parquet(self, df: pd.DataFrame) -> Callable[[IO[bytes]], None]:
+        """Get a function that writes ``df`` as parquet to a file.
+
+        ``df`` is converted to a :class:`pyarrow.Table` here, as
+        :meth:`pandas.DataFrame.to_parquet` would, so that any problems with it raise
+        before its member is created and the parquet can be written directly into the
+        member.
+        """
+        table = pa.Table.from_pandas(df)
+        if df.attrs:
+            table = table.replace_schema_metadata(
+                (table.schema.metadata or {}) | {b"PANDAS_ATTRS": json.dumps(df.attrs)}
+            )
+        # DataZip always reads whole files so statistics are not useful
+        return partial(
+            pq.write_table,
+            table,
+            compression=self._parquet_compression,
+            write_statistics=False,
+        )
+
+    def _pl_to_parquet(self, df: pl.DataFrame) -> Callable[[IO[bytes]], None]:
+        """Get a function that writes ``df`` as parquet to a file.
+
+        As with :meth:`DataZip._pd_to_parquet`, ``df`` is converted to a
+        :class:`pyarrow.Table` here so that any problems with it raise before its
+        member is created.
+        """
+        # polars panics rather than raising if asked to convert these to arrow
+        if any(dtype == pl.Object for dtype in df.schema.values()):
+            raise pl.exceptions.ComputeError(
+                "cannot write 'Object' datatype to parquet"
+            )
+        return partial(
+            pq.write_table,
+            df.to_arrow(),
+            compression=self._parquet_compression,
+            write_statistics=False,
+        )
+
+    @staticmethod
+    def _parquet_codec(codec: str | None) -> str:
+        """Check ``codec`` and normalize it to the name :mod:`pyarrow` uses."""
+        norm = "none" if codec is None else str(codec).lower()
+        if norm in _PARQUET_NONE:
+            return "none"
+        if norm not in _PARQUET_CODECS or not pa.Codec.is_available(norm):
+            raise ValueError(
+                f"{codec!r} is not an available parquet compression codec, use one of "
+                f"{sorted(_PARQUET_CODECS)}"
+            )
+        return norm
+
     @staticmethod
     def _str_cols(df: pd.DataFrame, *args) -> pd.DataFrame:
-        return df.set_axis(list(map(str, range(df.shape[1]))), axis="columns")
+        # a shallow copy shares the data, set_axis would copy it before pandas 3
+        out = df.copy(deep=False)
+        out.columns = pd.RangeIndex(df.shape[1]).astype(str)
+        return out
 
     def _json_get(self, *args):
         for arg in args:
+            if (name := f"{arg}.json") not in self.NameToInfo:
+                continue
             try:
-                return json.loads(self.read(f"{arg}.json"))
-            except Exception:  # noqa: S110
-                pass
+                return json.loads(self.read(name))
+            except json.JSONDecodeError:
+                LOGGER.warning("Unable to parse %s from %s", name, self.filename)
         return {}
 
     def read_dfs(self) -> Generator[tuple[str, pd.DataFrame | pd.Series]]:
@@ -951,9 +1280,9 @@ class DataZip(ZipFile):
             DeprecationWarning,
             stacklevel=2,
         )
-        for name, *suffix in (x.split(".") for x in self.namelist()):
-            if "parquet" in suffix:
-                yield name, self[name]
+        for name in self.NameToInfo:
+            if name.endswith(".parquet"):
+                yield (key := name.removesuffix(".parquet")), self[key]
 
     def writed(self, name: str, data: Any):
         """Write dict, df, str, or some other objects to name.
@@ -1,21 +1,26 @@
 """etoolbox CLI utility functions."""
 
 import argparse
+from collections.abc import Callable
+from importlib import import_module
 
-from etoolbox.utils.cloud import (
+# importing the modules that implement commands (and so :mod:`pandas`, :mod:`fsspec`,
+# etc.) is left to the command that is run, paths for help text come from here
+from etoolbox._paths import (
     AZURE_CACHE_PATH,
+    PUDL_CACHE_PATH,
+    PUDL_TOKEN_PATH,
     RMICFEZIL_TOKEN_PATH,
-    rmi_cloud_clean,
-    rmi_cloud_init,
 )
-from etoolbox.utils.pudl import (
-    CACHE_PATH as PUDL_CACHE_PATH,
-)
-from etoolbox.utils.pudl import (
-    TOKEN_PATH,
-    rmi_pudl_clean,
-)
-from etoolbox.utils.table_map import renamer
+
+
+def _lazy(module: str, func: str) -> Callable:
+    """Get a function that imports and calls ``func`` from ``module``."""
+
+    def _run(args):
+        return getattr(import_module(module), func)(args)
+
+    return _run
 
 
 def main():
@@ -49,7 +54,7 @@ def main():
         help="delete config including token along with cache.",
         dest="all",
     )
-    cloud_clean_sp.set_defaults(func=rmi_cloud_clean)
+    cloud_clean_sp.set_defaults(func=_lazy("etoolbox.utils.cloud", "rmi_cloud_clean"))
 
     cloud_init_sp = cloud_subparsers.add_parser(
         "init",
@@ -73,7 +78,7 @@ def main():
         help="print what would be done, but don't do anything.",
         dest="dry",
     )
-    cloud_init_sp.set_defaults(func=rmi_cloud_init)
+    cloud_init_sp.set_defaults(func=_lazy("etoolbox.utils.cloud", "rmi_cloud_init"))
 
     pudl_parser = subparsers.add_parser(
         "pudl",
@@ -89,7 +94,7 @@ def main():
     pudl_clean_sp.add_argument(
         "-l, --legacy",
         action="store_true",
-        help=f"remove legacy token at {TOKEN_PATH.parent} and legacy caches in "
+        help=f"remove legacy token at {PUDL_TOKEN_PATH.parent} and legacy caches in "
         f"{PUDL_CACHE_PATH.parent} without affecting current AWS caches.",
         default=False,
         dest="legacy",
@@ -110,7 +115,7 @@ def main():
         help="print what would be done, but don't do anything.",
         dest="dry",
     )
-    pudl_clean_sp.set_defaults(func=rmi_pudl_clean)
+    pudl_clean_sp.set_defaults(func=_lazy("etoolbox.utils.pudl", "rmi_pudl_clean"))
 
     pudl_rename_sp = pudl_subparsers.add_parser(
         "rename",
@@ -137,7 +142,7 @@ def main():
         " asked to confirm before tables are renamed.",
         dest="yes",
     )
-    pudl_rename_sp.set_defaults(func=renamer)
+    pudl_rename_sp.set_defaults(func=_lazy("etoolbox.utils.table_map", "renamer"))
 
     args = parser.parse_args()
     args.func(args)
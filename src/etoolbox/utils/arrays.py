@@ -59,19 +59,20 @@ def compare_dfs(
                 "if `align_col` is a list, it must represent more than one column"
             )
         _align_col = "+".join(align_col)
-        self[_align_col] = self[align_col].astype(str).apply("___".join, axis=1)
-        other[_align_col] = other[align_col].astype(str).apply("___".join, axis=1)
+        self[_align_col] = _str_cat(self, align_col)
+        other[_align_col] = _str_cat(other, align_col)
         align_col = _align_col
     # determine common values in align column, get just those values
     # sort the dfs and pull out the right columns
-    vals = set(self[align_col]).intersection(other[align_col])
+    vals = pd.Index(self[align_col].unique()).intersection(other[align_col].unique())
+    self_in, other_in = self[align_col].isin(vals), other[align_col].isin(vals)
     self_ = (
-        self[self[align_col].isin(vals)]
+        self[self_in]
         .sort_values([align_col])
         .reset_index(drop=True)[cols + [align_col]]  # noqa: RUF005 py3.11 only
     )
     other_ = (
-        other[other[align_col].isin(vals)]
+        other[other_in]
         .sort_values([align_col])
         .reset_index(drop=True)[cols + [align_col]]  # noqa: RUF005 py3.11 only
     )
@@ -98,8 +99,8 @@ def compare_dfs(
             "other_dup": _add_ix(
                 other_[other_[align_col].duplicated(keep=False)], "other"
             ),
-            "self_only": _add_ix(self[~self[align_col].isin(vals)], "self"),
-            "other_only": _add_ix(other[~other[align_col].isin(vals)], "other"),
+            "self_only": _add_ix(self[~self_in], "self"),
+            "other_only": _add_ix(other[~other_in], "other"),
         },
         names=["merge"],
     )
@@ -114,6 +115,12 @@ def compare_dfs(
     return out.iloc[:, 1:].sort_index(axis=1)
 
 
+def _str_cat(df: pd.DataFrame, cols: list) -> pd.Series:
+    """Concatenate ``cols`` of ``df`` as strings separated by ``___``."""
+    first, *rest = (df[c].astype(str) for c in cols)
+    return first.str.cat(rest, sep="___")
+
+
 def _isclose(i, j):
     """~Equivalent of ``np.isclose`` for arrays with strs."""
     if isinstance(i, str):
@@ -8,14 +8,11 @@ from pathlib import Path
 
 from fsspec import filesystem
 from fsspec.implementations.cached import WholeFileCacheFileSystem
-from platformdirs import user_cache_path, user_config_path
 
+from etoolbox._paths import AZURE_CACHE_PATH, RMICFEZIL_TOKEN_PATH
+from etoolbox._paths import CLOUD_CONFIG_PATH as CONFIG_PATH
 from etoolbox.utils.misc import all_logging_disabled
 
-CONFIG_PATH = user_config_path("rmi.cloud", ensure_exists=True)
-AZURE_CACHE_PATH = user_cache_path("rmi.cloud", ensure_exists=True)
-RMICFEZIL_TOKEN_PATH = CONFIG_PATH / "rmicfezil_token.txt"
-
 logger = logging.getLogger("etoolbox")
 
 
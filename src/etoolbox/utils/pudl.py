@@ -14,13 +14,12 @@ import polars as pl
 import pyarrow.parquet as pq
 from fsspec import filesystem
 from fsspec.implementations.cached import WholeFileCacheFileSystem
-from platformdirs import user_cache_path, user_config_path
 
+from etoolbox._paths import PUDL_CACHE_PATH as CACHE_PATH
+from etoolbox._paths import PUDL_TOKEN_PATH as TOKEN_PATH
 from etoolbox.utils.misc import have_internet
 
 logger = logging.getLogger("etoolbox")
-TOKEN_PATH = user_config_path("rmi.pudl") / ".pudl-access-key.json"
-CACHE_PATH = user_cache_path("rmi.pudl", ensure_exists=True) / "aws"
 BASE = "s3://pudl.catalyst.coop"
 
 
@@ -3,13 +3,14 @@
 import functools
 import importlib
 import json
+import sys
 from collections import Counter, OrderedDict, defaultdict, deque
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
 from traceback import TracebackException
 from typing import NamedTuple
-from zipfile import ZipFile
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
 
 import numpy as np
 import pandas as pd
@@ -26,6 +27,7 @@ from etoolbox.datazip._test_classes import (
     _TestKlassDzstate,
     _TestKlassSlotsCore,
     _TestKlassSlotsDict,
+    _TestKlassSlotsWeakref,
 )
 from etoolbox.datazip._utils import default_getstate, default_setstate
 from etoolbox.utils.testing import assert_equal, idfn
@@ -44,6 +46,7 @@ class TestUtils:
                 _TestKlassSlotsDict(foo=5).add_to_dict("bar", 6),
                 ({"bar": 6}, {"foo": 5}),
             ),
+            (_TestKlassSlotsWeakref(foo=5), (None, {"foo": 5})),
         ],
         ids=idfn,
     )
@@ -87,13 +90,55 @@ def test_get():
         assert z.get("q", 5) == 5
 
 
+def test_dup_obj_in_list():
+    """Test that an object first stored in a list is decoded once."""
+    obj = _TestKlass(a=5, b={"c": (2, 3.5)}, c=5.5)
+    with DataZip(buffer := BytesIO(), "w") as z0:
+        z0["a"] = [obj, 5]
+        z0["b"] = obj
+    with DataZip(buffer, "r") as z1:
+        assert z1["a"][0] is z1["b"]
+
+
+def test_temporary_objects():
+    """Test that objects that are garbage collected after storing are not mixed up."""
+    with DataZip(buffer := BytesIO(), "w") as z0:
+        for i in range(5):
+            z0[f"df{i}"] = pd.DataFrame({"a": [i]})
+            z0[f"obj{i}"] = _TestKlass(a=i, b=None, c=None)
+            z0[f"list{i}"] = [_TestKlass(a=i, b=None, c=None)]
+            z0[f"dict{i}"] = {"x": _TestKlass(a=i, b=None, c=None)}
+    with DataZip(buffer, "r") as z1:
+        assert [z1[f"df{i}"].a.iloc[0] for i in range(5)] == list(range(5))
+        assert [z1[f"obj{i}"].a for i in range(5)] == list(range(5))
+        assert [z1[f"list{i}"][0].a for i in range(5)] == list(range(5))
+        assert [z1[f"dict{i}"]["x"].a for i in range(5)] == list(range(5))
+
+
 def test_keys():
     """Test key method."""
     from collections.abc import KeysView
 
-    with DataZip(BytesIO(), "w") as z:
+    with DataZip(temp := BytesIO(), "w") as z:
         z["a"] = "a"
         assert z.keys() == KeysView({"a"})
+        z["b"] = _TestKlass(a=5)
+        assert z.keys() == KeysView({"a", "b"})
+        assert len(z) == 2
+    with DataZip(temp, "r") as z1:
+        assert z1.keys() == KeysView({"a", "b"})
+        assert "__state__" not in z1
+
+
+def test_contains():
+    """Test ``in`` with keys and file names."""
+    with DataZip(BytesIO(), "w") as z:
+        z["a"] = pd.DataFrame({"a": [1]})
+        z["b.c"] = 5
+        assert "a" in z
+        assert "a.parquet" in z
+        assert "b.c" in z
+        assert "c" not in z
 
 
 def test_no_decode():
@@ -181,6 +226,11 @@ def test_sqlalchemy(temp_dir):
         ("namedtuple_as_key_in_dd", defaultdict(list, {ObjMeta("this", "that"): 5})),
         ("namedtuple", ObjMeta("this", "that")),
         ("np.array", np.array([[0.0, 4.1], [3.2, 2.1]])),
+        ("np.array_fortran", np.asfortranarray([[0.0, 4.1], [3.2, 2.1]])),
+        ("np.array_strided", np.arange(10)[::3]),
+        ("np.array_0d", np.array(5.5)),
+        ("np.array_dt64", np.array(["2024-01-01", "2024-06-01"], dtype="M8[ns]")),
+        ("np.array_structured", np.zeros(2, dtype=[("é€", "f8"), ("b", "i4")])),
         ("_TestKlass", _TestKlass(a=5, b={"c": (2, 3.5)}, c=5.5)),
         ("path", Path.home()),
         ("type", [list, tuple, DataZip]),
@@ -258,6 +308,234 @@ def test_replace(temp_dir, save_old):
         assert z2["d"] == {"this": "that"}
 
 
+def test_object_array_error():
+    """Test that an object array raises before anything is written."""
+    with DataZip(BytesIO(), "w") as z:
+        with pytest.raises(ValueError, match="Object arrays"):
+            z["arr"] = np.array([1, "a", None], dtype=object)
+        assert "arr.npy" not in z.NameToInfo
+
+
+def test_pl_object_error():
+    """Test that a polars frame that cannot be written raises before its member."""
+    with DataZip(BytesIO(), "w") as z:
+        with pytest.raises(pl.exceptions.ComputeError):
+            z["pl"] = pl.DataFrame({"a": [object()]}, schema={"a": pl.Object})
+        assert "pl.parquet" not in z.NameToInfo
+
+
+def test_np_scalars():
+    """Test that numpy scalars are stored as their python equivalent."""
+    buffer = BytesIO()
+    with DataZip(buffer, "w") as z:
+        z["a"] = [np.float32(1.5), np.int32(3), np.bool_(True), np.uint8(4)]
+    with DataZip(buffer, "r") as z:
+        read = z["a"]
+    assert read == [1.5, 3, True, 4]
+    assert [type(v) for v in read] == [float, int, bool, int]
+
+
+def test_subclass_as_base(temp_dir):
+    """Test that subclasses of frames and arrays are stored as their base type."""
+
+    class MyFrame(pd.DataFrame):
+        @property
+        def _constructor(self):
+            return MyFrame
+
+    class MyArray(np.ndarray):
+        pass
+
+    df = MyFrame({"a": [1, 2, 3]})
+    arr = np.arange(3).view(MyArray)
+    with DataZip(temp_dir / "test_subclass_as_base.zip", "w") as z0:
+        z0["df"] = df
+        z0["arr"] = arr
+    with DataZip(temp_dir / "test_subclass_as_base.zip", "r") as z1:
+        assert type(z1["df"]) is pd.DataFrame
+        pd.testing.assert_frame_equal(z1["df"], pd.DataFrame(df))
+        assert type(z1["arr"]) is np.ndarray
+        assert np.array_equal(z1["arr"], arr)
+
+
+def test_parquet_not_compressed():
+    """Test that parquet is stored as is while other members use compression."""
+    with DataZip(BytesIO(), "w", compression=ZIP_DEFLATED) as z:
+        z["df"] = pd.DataFrame({"a": [1, 2, 3]})
+        z["pl"] = pl.DataFrame({"a": [1, 2, 3]})
+        z["array"] = np.array([1, 2, 3])
+        assert z.getinfo("df.parquet").compress_type == ZIP_STORED
+        assert z.getinfo("pl.parquet").compress_type == ZIP_STORED
+        assert z.getinfo("array.npy").compress_type == ZIP_DEFLATED
+
+
+def test_member_date_time():
+    """Test that members are dated when they were written."""
+    with DataZip(BytesIO(), "w") as z:
+        z["df"] = pd.DataFrame({"a": [1, 2, 3]})
+        z["array"] = np.array([1, 2, 3])
+        for name in ("df.parquet", "array.npy"):
+            written = datetime(*z.getinfo(name).date_time)
+            assert abs((datetime.now() - written).total_seconds()) < 60
+
+
+def test_default_compression():
+    """Test that members other than parquet are deflated by default."""
+    with DataZip(BytesIO(), "w") as z:
+        z["df"] = pd.DataFrame({"a": [1, 2, 3]})
+        z["array"] = np.array([1, 2, 3])
+        assert z.compresslevel == 1
+        assert z.getinfo("df.parquet").compress_type == ZIP_STORED
+        assert z.getinfo("array.npy").compress_type == ZIP_DEFLATED
+
+
+def test_json_compressed():
+    """Test that json files are compressed even when other members are not."""
+    with DataZip(buffer := BytesIO(), "w", compression=ZIP_STORED) as z:
+        z["array"] = np.array([1, 2, 3])
+    with DataZip(buffer, "r") as z:
+        assert z.getinfo("array.npy").compress_type == ZIP_STORED
+        assert z.getinfo("__attributes__.json").compress_type == ZIP_DEFLATED
+        assert z.getinfo("__metadata__.json").compress_type == ZIP_DEFLATED
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        ({}, "LZ4"),
+        ({"parquet_compression": "zstd"}, "ZSTD"),
+        ({"parquet_compression": "GZIP"}, "GZIP"),
+        ({"parquet_compression": "none"}, "UNCOMPRESSED"),
+        ({"parquet_compression": "uncompressed"}, "UNCOMPRESSED"),
+        ({"parquet_compression": None}, "UNCOMPRESSED"),
+    ],
+    ids=idfn,
+)
+def test_parquet_compression(kwargs, expected):
+    """Test the codec used for parquet files."""
+    import pyarrow.parquet as pq
+
+    with DataZip(BytesIO(), "w", **kwargs) as z:
+        z["df"] = pd.DataFrame({"a": [1, 2, 3]})
+        z["pl"] = pl.DataFrame({"a": [1, 2, 3]})
+        for name in ("df.parquet", "pl.parquet"):
+            meta = pq.ParquetFile(BytesIO(z.read(name))).metadata
+            assert meta.row_group(0).column(0).compression == expected
+
+
+def test_parquet_compression_error():
+    """Test that an invalid parquet codec raises before anything is written."""
+    with pytest.raises(ValueError, match="parquet compression codec"):
+        DataZip(BytesIO(), "w", parquet_compression="lzo")
+
+
+def test_pd_arrow_dtypes_old_pandas(monkeypatch):
+    """Test that ``pd_arrow_dtypes`` raises a clear error with pandas < 2."""
+    monkeypatch.setattr(pd, "__version__", "1.5.3")
+    with pytest.raises(ValueError, match="requires pandas"):
+        DataZip(BytesIO(), "r", pd_arrow_dtypes=True)
+
+
+@pytest.mark.skipif(pd.__version__ < "2.0.0", reason="ArrowDtype requires pandas 2")
+def test_pd_arrow_dtypes(temp_dir):
+    """Test reading pandas objects with arrow dtypes."""
+    df = pd.DataFrame({(0, "a"): [1, 2], (0, "b"): [4.5, 5.5]})
+    df.attrs = {"foo": "bar"}
+    with DataZip(temp_dir / "test_pd_arrow_dtypes.zip", "w") as z:
+        z["df"] = df
+        z["series"] = pd.Series([1, 2], name="a")
+    with DataZip(temp_dir / "test_pd_arrow_dtypes.zip", "r", pd_arrow_dtypes=True) as z:
+        read = z["df"]
+        series = z["series"]
+    assert all(isinstance(d, pd.ArrowDtype) for d in read.dtypes)
+    assert isinstance(series.dtype, pd.ArrowDtype)
+    assert read.attrs == df.attrs
+    pd.testing.assert_frame_equal(read, df, check_dtype=False)
+    pd.testing.assert_series_equal(
+        series, pd.Series([1, 2], name="a"), check_dtype=False
+    )
+
+
+@pytest.mark.parametrize("cache_decoded", [True, False], ids=idfn)
+def test_cache_decoded(cache_decoded):
+    """Test that decoded data is only kept when ``cache_decoded`` is True."""
+    buffer = BytesIO()
+    with DataZip(buffer, "w") as z:
+        z["df"] = pd.DataFrame({"a": [1, 2, 3]})
+        z["array"] = np.array([1, 2, 3])
+    with DataZip(buffer, "r", cache_decoded=cache_decoded) as z:
+        assert (z["df"] is z["df"]) is cache_decoded
+        assert (z["array"] is z["array"]) is cache_decoded
+        pd.testing.assert_frame_equal(z["df"], pd.DataFrame({"a": [1, 2, 3]}))
+
+
+def test_member_buffer(temp_dir):
+    """Test that uncompressed members are read from a memory map of the archive."""
+    df = pd.DataFrame({"a": [1, 2, 3], "b": [4.5, 5.5, 6.5]})
+    with DataZip(
+        temp_dir / "test_member_buffer.zip", "w", compression=ZIP_DEFLATED
+    ) as z:
+        z["df"] = df
+        z["series"] = df.a
+        z["pl"] = pl.from_pandas(df)
+        z["array"] = np.array([1, 2, 3])
+    with DataZip(temp_dir / "test_member_buffer.zip", "r") as z:
+        assert z._member_buffer("df.parquet").to_pybytes() == z.read("df.parquet")
+        assert z._mmap is not None
+        assert z._member_buffer("array.npy").to_pybytes() == z.read("array.npy")
+        pd.testing.assert_frame_equal(z["df"], df)
+        pd.testing.assert_series_equal(z["series"], df.a)
+        assert z["pl"].equals(pl.from_pandas(df))
+    assert z._mmap is None
+
+
+def test_member_buffer_chdir(temp_dir, monkeypatch):
+    """Test reading after changing directory from a DataZip opened by relative path."""
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    monkeypatch.chdir(temp_dir)
+    with DataZip("test_member_buffer_chdir.zip", "w") as z:
+        z["df"] = df
+    with DataZip("test_member_buffer_chdir.zip", "r") as z:
+        monkeypatch.chdir(temp_dir.parent)
+        pd.testing.assert_frame_equal(z["df"], df)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="cannot rename open files")
+def test_member_buffer_replaced(temp_dir):
+    """Test that an open DataZip reads its own data after its path is replaced."""
+    file = temp_dir / "test_member_buffer_replaced.zip"
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    with DataZip(file, "w") as z:
+        z["df"] = df
+    with DataZip(file, "r") as z:
+        file.rename(temp_dir / "test_member_buffer_replaced_old.zip")
+        with DataZip(file, "w") as z1:
+            z1["df"] = pd.DataFrame({"a": [4, 5, 6]})
+        pd.testing.assert_frame_equal(z["df"], df)
+
+
+def test_member_buffer_named_file(temp_dir):
+    """Test that a file object's name is not used as a path to memory map."""
+
+    class NamedBytesIO(BytesIO):
+        name = "remote/bucket/a.zip"
+
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    with DataZip(temp_dir / "test_member_buffer_named_file.zip", "w") as z:
+        z["df"] = df
+        z["pl"] = pl.from_pandas(df)
+    buffer = NamedBytesIO((temp_dir / "test_member_buffer_named_file.zip").read_bytes())
+    with ZipFile(temp_dir / "test_member_buffer_named_outer.zip", "w") as outer:
+        outer.write(temp_dir / "test_member_buffer_named_file.zip", "inner.zip")
+    with ZipFile(temp_dir / "test_member_buffer_named_outer.zip", "r") as outer:
+        with outer.open("inner.zip") as inner:
+            for file in (buffer, inner):
+                with DataZip(file, "r") as z:
+                    pd.testing.assert_frame_equal(z["df"], df)
+                    assert z["pl"].equals(pl.from_pandas(df))
+                    assert z._mmap is None
+
+
 def test_replace_buffer_error():
     """Test that supplying one buffer produces an error."""
     with pytest.raises(TypeError):
@@ -433,6 +711,16 @@ class TestWPDBackend:
                 ),
             ),
             ("mtdf", False, pd.DataFrame()),
+            ("df_mixed_cols", False, pd.DataFrame([[0, 1.5]], columns=["a", 1])),
+            ("df_bool_cols", False, pd.DataFrame([[1, 2.5]], columns=[True, False])),
+            (
+                "df_tuple_cols",
+                False,
+                pd.DataFrame(
+                    [[0, 1.5]],
+                    columns=pd.Index([(0, "a"), (1, "b")], tupleize_cols=False),
+                ),
+            ),
             (
                 "df_arrow",
                 False,
@@ -451,6 +739,8 @@ class TestWPDBackend:
             ),
             ("series_tp_name", False, pd.Series([1, 2, 3, 4], name=(0, "a"))),
             ("series_no_name", False, pd.Series([1, 2, 3, 4])),
+            ("series_np_name", False, pd.Series([1, 2], name=(np.int64(0), "a"))),
+            ("series_len_1", False, pd.Series([1], name="series")),
             ("tuple_w_series", False, (1, pd.Series([1, 2, 3, 4], name="series"))),
             (
                 "dup_series_in_dicts",